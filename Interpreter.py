@@ -1,120 +1,101 @@
+import re
 import sys
 import string
+from array import array
+from collections import OrderedDict
+from typing import Any, Iterable, Iterator, NoReturn, Optional
 
 
 class InterpreterError(Exception):
     pass
 
 
-class Token:
-    # Represents a token with type and value
-    def __init__(self, ttype, value):
-        self.ttype = ttype
-        self.value = value
+# Token types
+IDENTIFIER = 0
+LITERAL = 1
+PLUS = 2
+MINUS = 3
+TIMES = 4
+LPAREN = 5
+RPAREN = 6
+ASSIGN = 7
+SEMI = 8
+EOF = 9
 
-    def __repr__(self):
-        return f"Token({self.ttype}, {self.value})"
+# A token is a plain (ttype, value) tuple
+Token = tuple[int, Any]
 
+# Token marking the end of the input
+_EOF_TOKEN: Token = (EOF, '')
+
+# Token type names used in error messages, indexed by token type
+TOKEN_NAMES = ('IDENTIFIER', 'LITERAL', '+', '-', '*', '(', ')', '=', ';', 'EOF')
 
 class Lexer:
-    # Token types
-    IDENTIFIER = 'IDENTIFIER'
-    LITERAL = 'LITERAL'
-    PLUS = '+'
-    MINUS = '-'
-    TIMES = '*'
-    LPAREN = '('
-    RPAREN = ')'
-    ASSIGN = '='
-    SEMI = ';'
-    EOF = 'EOF'
-
-    def __init__(self, text):
+    # Attribute types are declared so the module can be compiled with mypyc
+    text: str
+
+    def __init__(self, text: str) -> None:
         self.text = text
-        self.pos = 0
-        self.length = len(text)
 
-    def error(self, msg):
+    def error(self, msg: str) -> NoReturn:
         raise InterpreterError(f"Lexical error: {msg}")
 
-    def peek(self):
-        # Peek at the current character
-        if self.pos < self.length:
-            return self.text[self.pos]
-        return None
-
-    def advance(self):
-        # Advance to the next character
-        self.pos += 1
-
-    def skip_whitespace(self):
-        # Skip whitespace characters
-        while self.peek() and self.peek().isspace():
-            self.advance()
-
-    def next_token(self):
-        # Return the next token from the input
-        self.skip_whitespace()
-        current_char = self.peek()
-
-        if current_char is None:
-            return Token(Lexer.EOF, '')
-
-        # Single-character tokens
-        if current_char == '+':
-            self.advance()
-            return Token(Lexer.PLUS, '+')
-        elif current_char == '-':
-            self.advance()
-            return Token(Lexer.MINUS, '-')
-        elif current_char == '*':
-            self.advance()
-            return Token(Lexer.TIMES, '*')
-        elif current_char == '(':
-            self.advance()
-            return Token(Lexer.LPAREN, '(')
-        elif current_char == ')':
-            self.advance()
-            return Token(Lexer.RPAREN, ')')
-        elif current_char == '=':
-            self.advance()
-            return Token(Lexer.ASSIGN, '=')
-        elif current_char == ';':
-            self.advance()
-            return Token(Lexer.SEMI, ';')
-
-        # Identifiers: start with a letter or underscore, then letters/digits/underscore
-        if current_char.isalpha() or current_char == '_':
-            start_pos = self.pos
-            while self.peek() and (self.peek().isalnum() or self.peek() == '_'):
-                self.advance()
-            value = self.text[start_pos:self.pos]
-            return Token(Lexer.IDENTIFIER, value)
-
-        # Literals: integers only (no leading zeros unless zero itself)
-        if current_char.isdigit():
-            start_pos = self.pos
-            self.advance()
-            if self.text[start_pos] != '0':
-                while self.peek() and self.peek().isdigit():
-                    self.advance()
-            else:
-                if self.peek() and self.peek().isdigit():
-                    self.error("Invalid number format (leading zero).")
-            value = self.text[start_pos:self.pos]
-            return Token(Lexer.LITERAL, value)
-
+    def __iter__(self) -> Iterator[Token]:
+        # Yield tokens lazily in a single regex pass; each match consumes
+        # the whitespace in front of its token. Tokens are plain
+        # (ttype, value) tuples, ending with an EOF token. Literals carry
+        # their int value.
+        text = self.text
+        pos = 0
+        for match in _TOKEN_RE.finditer(text):
+            if match.start() != pos:
+                self.unexpected(pos)
+            pos = match.end()
+            kind = match.lastindex
+            # Every alternative of _TOKEN_RE is a group, so one always matched
+            assert kind is not None
+            value = match.group(kind)
+            if kind == 2:
+                value = int(value)
+            yield (_GROUP_TYPES[kind], value)
+        if _NON_WS.search(text, pos) is not None:
+            self.unexpected(pos)
+        yield _EOF_TOKEN
+
+    def tokenize(self) -> list[Token]:
+        # Tokenize the entire input
+        return list(self)
+
+    def unexpected(self, pos: int) -> NoReturn:
+        # Report the first non-whitespace character at or after pos; the
+        # lexer only calls this when there is one
+        match = _NON_WS.search(self.text, pos)
+        assert match is not None
+        current_char = match.group()
+        if current_char == '0':
+            self.error("Invalid number format (leading zero).")
         self.error(f"Unexpected character: {current_char}")
 
-    def tokenize(self):
-        # Tokenize the entire input
-        tokens = []
-        while True:
-            token = self.next_token()
-            tokens.append(token)
-            if token.ttype == self.EOF:
-                break
-        return tokens
+
+# One group per token kind, ordered by how often each kind shows up in a
+# typical program so the regex engine tries the common alternatives first.
+# Leading whitespace is skipped as part of the same match:
+# identifier | literal (no leading zeros unless zero itself) |
+# ; | = | + | - | * | ( | )
+_TOKEN_RE = re.compile(
+    r"\s*(?:([A-Za-z_]\w*)|(0(?!\d)|[1-9]\d*)"
+    r"|(;)|(=)|(\+)|(-)|(\*)|(\()|(\)))"
+)
+
+_NON_WS = re.compile(r"\S")
+
+# Token type for each group of _TOKEN_RE, indexed by match.lastindex
+# (group 0 is the whole match and never a token kind)
+_GROUP_TYPES: tuple[int, ...] = (-1, IDENTIFIER, LITERAL, SEMI, ASSIGN, PLUS, MINUS, TIMES, LPAREN, RPAREN)
+
+# Binding power of each binary operator token
+_LBP = {PLUS: 10, MINUS: 10, TIMES: 20}
 
 
 class Parser:
@@ -124,157 +105,316 @@ class Parser:
     # Exp: Exp + Term | Exp - Term | Term
     # Term: Term * Fact | Fact
     # Fact: ( Exp ) | - Fact | + Fact | Literal | Identifier
-
-    def __init__(self, tokens):
-        self.tokens = tokens
-        self.pos = 0
-
-    def error(self, msg):
+    #
+    # The grammar is LL(1), so tokens are pulled from any token iterable
+    # (such as a Lexer) one at a time with a single token of lookahead.
+    # Every node is lowered as soon as it is built (see Lowering), so
+    # parse() returns the lowered assignments without building a plain AST
+    # first.
+
+    tokens: Iterator[Token]
+    cur: Token
+
+    def __init__(self, tokens: Iterable[Token], lowering: Optional["Lowering"] = None) -> None:
+        self.tokens = iter(tokens)
+        self.cur = next(self.tokens, _EOF_TOKEN)
+        self.lowering = lowering if lowering is not None else Lowering()
+        self.make = self.lowering.node
+
+    def error(self, msg: str) -> NoReturn:
         raise InterpreterError(f"Syntax error: {msg}")
 
-    def peek(self):
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
-        return None
-
-    def consume(self, ttype=None):
-        token = self.peek()
-        if token is None:
-            self.error("Unexpected end of input.")
-        if ttype is not None and token.ttype != ttype:
-            self.error(f"Expected {ttype}, got {token.ttype}")
-        self.pos += 1
+    def consume(self, ttype: Optional[int] = None) -> Token:
+        token = self.cur
+        if ttype is not None and token[0] != ttype:
+            self.error(f"Expected {TOKEN_NAMES[ttype]}, got {TOKEN_NAMES[token[0]]}")
+        self.cur = next(self.tokens, _EOF_TOKEN)
         return token
 
-    def parse(self):
+    def parse(self) -> list:
         # Parse the entire program
-        assignments = []
-        while True:
-            token = self.peek()
-            if token is None or token.ttype == 'EOF':
-                break
-            assignments.append(self.assignment())
+        assignments: list[tuple] = []
+        append = assignments.append
+        assignment = self.assignment
+        while self.cur[0] != EOF:
+            append(assignment())
+        self.lowering.finish()
         return assignments
 
-    def assignment(self):
+    def assignment(self) -> tuple:
         # Assignment: Identifier = Exp ;
-        lhs = self.consume('IDENTIFIER')
-        self.consume('=')
+        lhs = self.consume(IDENTIFIER)
+        self.consume(ASSIGN)
         exp = self.exp()
-        self.consume(';')
-        return ('assign', lhs.value, exp)
+        self.consume(SEMI)
+        return self.lowering.assign(lhs[1], exp)
 
-    def exp(self):
-        # Exp: Exp + Term | Exp - Term | Term
-        node = self.term()
-        while True:
-            token = self.peek()
-            if token and token.ttype in ('+', '-'):
-                op = self.consume().value
-                right = self.term()
-                node = (op, node, right)
-            else:
-                break
-        return node
-
-    def term(self):
-        # Term: Term * Fact | Fact
+    def exp(self, min_bp: int = 0) -> tuple:
+        # Exp and Term by precedence climbing: keep folding in operators
+        # that bind tighter than min_bp. Recursing with the operator's own
+        # binding power makes operators of equal precedence left-associative.
         node = self.fact()
+        tokens = self.tokens
+        make = self.make
+        binding_power = _LBP.get
         while True:
-            token = self.peek()
-            if token and token.ttype == '*':
-                self.consume('*')
-                right = self.fact()
-                node = ('*', node, right)
-            else:
+            token = self.cur
+            lbp = binding_power(token[0], 0)
+            if lbp <= min_bp:
                 break
+            self.cur = next(tokens, _EOF_TOKEN)
+            node = make((token[1], node, self.exp(lbp)))
         return node
 
-    def fact(self):
+    def fact(self) -> tuple:
         # Fact: ( Exp ) | - Fact | + Fact | Literal | Identifier
-        token = self.peek()
-        if token.ttype == '(':
-            self.consume('(')
+        # The current token's type is already known in each branch, so it
+        # is skipped without going through consume()
+        token = self.cur
+        ttype = token[0]
+        if ttype == IDENTIFIER:
+            self.cur = next(self.tokens, _EOF_TOKEN)
+            return self.make(('var', token[1]))
+        elif ttype == LITERAL:
+            self.cur = next(self.tokens, _EOF_TOKEN)
+            return self.make(('lit', token[1]))
+        elif ttype == LPAREN:
+            self.cur = next(self.tokens, _EOF_TOKEN)
             node = self.exp()
-            self.consume(')')
+            self.consume(RPAREN)
             return node
-        elif token.ttype == '+':
-            self.consume('+')
-            node = self.fact()
-            return ('+', node)
-        elif token.ttype == '-':
-            self.consume('-')
-            node = self.fact()
-            return ('-', node)
-        elif token.ttype == 'LITERAL':
-            val = self.consume('LITERAL').value
-            return ('lit', int(val))
-        elif token.ttype == 'IDENTIFIER':
-            val = self.consume('IDENTIFIER').value
-            return ('var', val)
+        elif ttype == MINUS:
+            self.cur = next(self.tokens, _EOF_TOKEN)
+            return self.make(('-', self.fact()))
+        elif ttype == PLUS:
+            self.cur = next(self.tokens, _EOF_TOKEN)
+            return self.make(('+', self.fact()))
         else:
             self.error("Invalid factor")
 
 
-class Interpreter:
-    def __init__(self, assignments):
-        self.assignments = assignments
-        self.vars = {}
+def _fold_node(node, make):
+    # Simplify one node whose operands are already simplified: drop unary
+    # plus, cancel pairs of unary minus, evaluate operators whose operands
+    # are all literals and pull negations out of products so they can
+    # cancel further up. Operands are never reordered or dropped, so an
+    # uninitialized variable is still reported exactly as before.
+    # The node itself is returned when nothing changes; make is applied to
+    # any nested node created along the way.
+    nodetype = node[0]
+    if len(node) == 2:
+        child = node[1]
+        if nodetype == '+':
+            return child
+        if child[0] == 'lit':
+            return ('lit', -child[1])
+        if child[0] == '-' and len(child) == 2:
+            return child[1]
+        return node
+
+    left, right = node[1], node[2]
+    if left[0] == 'lit' and right[0] == 'lit':
+        if nodetype == '+':
+            return ('lit', left[1] + right[1])
+        if nodetype == '-':
+            return ('lit', left[1] - right[1])
+        return ('lit', left[1] * right[1])
+
+    right_negated = right[0] == '-' and len(right) == 2
+    if nodetype == '*':
+        left_negated = left[0] == '-' and len(left) == 2
+        if left_negated:
+            left = left[1]
+        if right_negated:
+            right = right[1]
+        if left_negated != right_negated:
+            return ('-', make(('*', left, right)))
+    elif right_negated:
+        # a + -b is a - b, and a - -b is a + b
+        return ('-' if nodetype == '+' else '+', left, right[1])
+    if left is node[1] and right is node[2]:
+        return node
+    return (nodetype, left, right)
 
-    def eval_exp(self, node):
-        if not isinstance(node, tuple):
-            raise InterpreterError("Invalid AST node.")
 
+def _share_key(node):
+    # Hash-consing key of a node whose operands are already shared
+    nodetype = node[0]
+    if nodetype in ('lit', 'var'):
+        return node
+    if len(node) == 2:
+        return (nodetype, id(node[1]))
+    left, right = node[1], node[2]
+    if nodetype != '-' and id(right) < id(left):
+        return (nodetype, id(right), id(left))
+    return (nodetype, id(left), id(right))
+
+
+class NameResolver:
+    # Assigns every variable an integer slot in order of first appearance.
+    # self.name_map maps each name to its slot.
+
+    def __init__(self):
+        self.name_map = {}
+
+    def slot(self, name):
+        if name not in self.name_map:
+            self.name_map[name] = len(self.name_map)
+        return self.name_map[name]
+
+
+class Lowering:
+    # Builds the IR the Interpreter runs while parsing. The Parser passes
+    # every node it builds, with operands already lowered, through node(),
+    # and every assignment through assign(). Each node is lowered as it is
+    # created:
+    # - variables are resolved to slots (see NameResolver)
+    # - the node is folded (see _fold_node)
+    # - the node is hash-consed, so structurally identical subtrees are
+    #   one shared tuple; operands of + and * are keyed in sorted order,
+    #   so x+y and y+x share a node
+    # Programs have no control flow, so a variable read before any
+    # assignment to it is known statically. The first one is reported by
+    # finish(), after any syntax error in the program.
+    # Assignments are lowered to ('assign', varname, exp, slot, free_slots),
+    # where free_slots are the slots exp reads.
+
+    def __init__(self):
+        self.resolver = NameResolver()
+        self.assigned = set()
+        self.reads = set()
+        self.table = {}
+        self.uninitialized = None
+
+    def node(self, node):
         nodetype = node[0]
+        if nodetype == 'var':
+            slot = self.resolver.slot(node[1])
+            if slot not in self.assigned and self.uninitialized is None:
+                self.uninitialized = node[1]
+            self.reads.add(slot)
+            node = ('var', slot)
+        elif nodetype != 'lit':
+            node = _fold_node(node, self.share)
+        return self.share(node)
+
+    def share(self, node):
+        return self.table.setdefault(_share_key(node), node)
+
+    def assign(self, varname, exp):
+        slot = self.resolver.slot(varname)
+        self.assigned.add(slot)
+        free_slots = tuple(sorted(self.reads))
+        self.reads = set()
+        return ('assign', varname, exp, slot, free_slots)
+
+    def finish(self):
+        # Called once the whole program has been parsed
+        if self.uninitialized is not None:
+            raise InterpreterError(f"Uninitialized variable: {self.uninitialized}")
 
-        # Handle literals
-        if nodetype == 'lit':
-            return node[1]
 
-        # Handle variables
-        if nodetype == 'var':
-            var_name = node[1]
-            if var_name not in self.vars:
-                raise InterpreterError(f"Uninitialized variable: {var_name}")
-            return self.vars[var_name]
-
-        # Handle unary operators
-        # If node has length 2, it's unary
-        if nodetype in ('+', '-') and len(node) == 2:
-            # Unary plus or minus
-            val = self.eval_exp(node[1])
-            if nodetype == '+':
-                return val  # unary plus just returns the value
-            else:
-                return -val  # unary minus negates the value
-
-        # Handle binary operators
-        # If node has length 3, it's binary
-        if nodetype in ('+', '-', '*') and len(node) == 3:
-            left = self.eval_exp(node[1])
-            right = self.eval_exp(node[2])
-            if nodetype == '+':
-                return left + right
-            elif nodetype == '-':
-                return left - right
-            elif nodetype == '*':
-                return left * right
-
-        raise InterpreterError("Unknown node structure in evaluation.")
+class Interpreter:
+    # Maximum number of remembered right-hand side results
+    MEMO_SIZE = 256
+
+    def __init__(self, assignments):
+        self.assignments = assignments
+        # Every variable is assigned before it is read (see Lowering), so
+        # the assignments name every slot
+        name_map = {varname: slot for _, varname, _, slot, _ in assignments}
+        self.name_map = name_map
+        # Variable values are stored unboxed as int64 while they fit; see
+        # store(). Reads before assignment are rejected while lowering (see
+        # Lowering), so no initialized flags are needed.
+        self.slots = array('q', [0]) * len(name_map)
+        # (id(exp), values of its free variables) -> value, in LRU order
+        self.memo = OrderedDict()
+
+    def store(self, slot, value):
+        # Store a value that does not fit in int64 by moving all variables
+        # to a list of Python ints. Returns the new slot storage.
+        self.slots = list(self.slots)
+        self.slots[slot] = value
+        return self.slots
+
     def run(self):
-        for assign in self.assignments:
-            _, varname, exp = assign
-            self.vars[varname] = self.eval_exp(exp)
-        for var in sorted(self.vars.keys()):
-            print(f"{var} = {self.vars[var]}")
+        slots = self.slots
+        memo = self.memo
+        for _, _, exp, slot, free_slots in self.assignments:
+            # Lowering shares identical right-hand sides, so the same
+            # expression over the same inputs maps to the same key
+            key = (id(exp), tuple([slots[s] for s in free_slots]))
+            if key in memo:
+                memo.move_to_end(key)
+                value = memo[key]
+            else:
+                value = self.eval_exp(exp)
+                memo[key] = value
+                if len(memo) > self.MEMO_SIZE:
+                    memo.popitem(last=False)
+            try:
+                slots[slot] = value
+            except OverflowError:
+                slots = self.store(slot, value)
+        for name, slot in sorted(self.name_map.items()):
+            print(f"{name} = {slots[slot]}")
+
+    def eval_exp(self, exp):
+        # Evaluate one right-hand side with an explicit work stack instead
+        # of recursion. An operator node is pushed back under a None marker,
+        # then its operands, left one on top; when the marker comes off the
+        # stack, the operands' values are on top of the value stack and are
+        # combined in place.
+        # Lowering makes identical subtrees one tuple, so an operator's
+        # value is cached by node id and a shared subtree is computed only
+        # once per right-hand side.
+        slots = self.slots
+        cache = {}
+        values = []
+        push = values.append
+        pop = values.pop
+        stack = [exp]
+        expand = stack.append
+        take = stack.pop
+        while stack:
+            node = take()
+            if node is None:
+                node = take()
+                if len(node) == 2:
+                    # Folding leaves no unary plus
+                    value = -pop()
+                else:
+                    right = pop()
+                    nodetype = node[0]
+                    if nodetype == '+':
+                        value = pop() + right
+                    elif nodetype == '*':
+                        value = pop() * right
+                    else:
+                        value = pop() - right
+                cache[id(node)] = value
+                push(value)
+                continue
+            nodetype = node[0]
+            if nodetype == 'var':
+                push(slots[node[1]])
+            elif nodetype == 'lit':
+                push(node[1])
+            elif id(node) in cache:
+                push(cache[id(node)])
+            else:
+                expand(node)
+                expand(None)
+                if len(node) == 3:
+                    expand(node[2])
+                expand(node[1])
+        return values[0]
 
 
 def run_program(program):
-    lexer = Lexer(program)
-    tokens = lexer.tokenize()
-    parser = Parser(tokens)
-    assignments = parser.parse()
-    interpreter = Interpreter(assignments)
+    parser = Parser(Lexer(program))
+    interpreter = Interpreter(parser.parse())
     interpreter.run()
 
 